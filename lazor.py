@@ -17,7 +17,7 @@ Game Logic:
    type interacts with the lasers differently, either reflecting, absorbing,
    or allowing the laser to pass through and split.
 
-3. The solver tries different configurations of block placements until it
+3. The solver places blocks one at a time, backtracking on dead ends, until it
    finds a solution where all lasers intersect the specified target points.
 
 4. The solution is saved as a visual representation in an image file,
@@ -38,7 +38,7 @@ The game includes several block types, each represented by a specific symbol:
 'none' (Symbol: 'x'):
     Represents unavaible. No block can be place on this cell.
 'laser' (Symbol: 'L'):
-    Represents a laser intersects this cell, used for displaying solution only.
+    Represents a laser intersects this cell, used for displaying only.
 
 Laser:
 ------
@@ -57,21 +57,27 @@ Attributes:
     starting position and direction.
 `self.points`:
     A set of target points that lasers must intersect to solve the puzzle.
+`self.target_mask`:
+    A flat mask of the grid cells holding a target point.
+`self.hit_mask`:
+    A flat mask of the grid cells the lasers of the solution pass through.
 `self.available_blocks`:
     A dictionary of block types and their available counts.
 `self.solution_found`:
     A boolean flag indicating whether a solution has been found.
 `self.initial_lasers`:
     A copy of the initial laser positions and directions for reset purposes.
+`self.laser_states`:
+    The initial (x, y, vx, vy) of every laser, as traced by the solver.
 
 Main Solver Flow:
 -----------------
 1. The solver reads the grid configuration and laser setup
    from the specified .bff file.
-2. It generates all possible placements for the blocks
-   based on their availability and tries each configuration.
-3. For each configuration, it simulates the laser paths
-   based on block interactions.
+2. It places the available blocks one at a time with a backtracking search,
+   only trying positions that the current laser paths pass by.
+3. After each placement, it simulates the laser paths
+   based on block interactions and undoes the placement on a dead end.
 4. If all target points are hit by lasers, the solution is considered found.
 5. The final solution is saved as an image.
 
@@ -90,11 +96,57 @@ Classes:
 
 import os
 import time
-import copy
 import itertools
+import functools
+from collections import deque
 from PIL import Image, ImageDraw, ImageFont
 import math
 
+# Block types in the order of their integer codes in the grid storage
+BLOCK_TYPES = ('none', 'empty', 'reflect', 'opaque', 'refract', 'laser')
+NONE, EMPTY, REFLECT, OPAQUE, REFRACT, LASER = range(len(BLOCK_TYPES))
+BLOCK_CODES = {block_type: code
+               for code, block_type in enumerate(BLOCK_TYPES)}
+
+# What a laser does next, given the blocks beside it along x and y
+(ACTION_MOVE, ACTION_REFLECT_X, ACTION_REFLECT_Y, ACTION_ABSORB,
+ ACTION_REFRACT_X, ACTION_REFRACT_Y) = range(6)
+
+# Maximum number of steps traced for a single laser, per cell of the grid.
+# A laser has four diagonal directions, so after this many steps per cell
+# it has been through every state it can reach
+MAX_STEPS_PER_CELL = 4
+
+# Size of the head of a laser start arrow, drawn ARROWHEAD_ANGLE either
+# side of the laser direction
+ARROWHEAD_LENGTH = 6
+ARROWHEAD_ANGLE = math.pi / 6
+
+
+def arrowhead_offsets(vx, vy):
+    '''
+    Computes the offsets from the tip of a laser start arrow back to the
+    two ends of its head.
+
+    Args:
+        vx, vy (int):
+            The direction of the laser.
+
+    Returns:
+        tuple:
+            (left_dx, left_dy, right_dx, right_dy)
+    '''
+    angle = math.atan2(vy, vx)
+    return (ARROWHEAD_LENGTH * math.cos(angle + ARROWHEAD_ANGLE),
+            ARROWHEAD_LENGTH * math.sin(angle + ARROWHEAD_ANGLE),
+            ARROWHEAD_LENGTH * math.cos(angle - ARROWHEAD_ANGLE),
+            ARROWHEAD_LENGTH * math.sin(angle - ARROWHEAD_ANGLE))
+
+
+# Arrowhead offsets of the four diagonal directions lasers start in
+ARROWHEAD_OFFSETS = {(vx, vy): arrowhead_offsets(vx, vy)
+                     for vx in (-1, 1) for vy in (-1, 1)}
+
 
 class Block:
     '''
@@ -107,6 +159,10 @@ class Block:
             Whether the block is fixed in position (True) or movable (False).
     '''
 
+    # A block only holds its type and fixed flag, so skip the per-instance
+    # dict
+    __slots__ = ('block_type', 'fixed')
+
     def __init__(self, block_type, fixed=False):
         '''
         Initializes a Block instance with a specified type and fixed status.
@@ -143,6 +199,48 @@ class Block:
         return self.block_type in ('reflect', 'opaque', 'refract')
 
 
+class BlockView(Block):
+    '''
+    A read-only Block, shared by every cell with the same block type and
+    fixed status. Assigning to its attributes raises AttributeError.
+    '''
+
+    __slots__ = ()
+
+    def __init__(self, block_type, fixed=False):
+        object.__setattr__(self, 'block_type', block_type)
+        object.__setattr__(self, 'fixed', fixed)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('shared Block views are read-only')
+
+    def __delattr__(self, name):
+        raise AttributeError('shared Block views are read-only')
+
+
+# Block type and fixed status of every .bff grid character
+BFF_GRID_BLOCKS = {
+    'x': ('none', True),
+    'o': ('empty', False),
+    'A': ('reflect', True),
+    'B': ('opaque', True),
+    'C': ('refract', True)
+}
+# Read-only Block views handed out by Grid.get_block, one per
+# (code, fixed) pair, so reading the grid back allocates nothing
+BLOCK_VIEWS = {(code, fixed): BlockView(block_type, bool(fixed))
+               for code, block_type in enumerate(BLOCK_TYPES)
+               for fixed in (0, 1)}
+# Kind of a .bff line outside the grid section, by its first character
+BFF_LINE_KINDS = {
+    'A': 'block',
+    'B': 'block',
+    'C': 'block',
+    'L': 'laser',
+    'P': 'point'
+}
+
+
 class Laser:
     '''
     A class representing a laser in the Lazors game.
@@ -158,6 +256,8 @@ class Laser:
             The y-component of the laser's direction vector.
     '''
 
+    __slots__ = ('x', 'y', 'vx', 'vy')
+
     def __init__(self, x, y, vx, vy):
         '''
         Initializes a Laser instance with a starting position and direction.
@@ -244,11 +344,23 @@ class Grid:
     '''
     A class representing the game grid in the Lazors game.
 
+    The blocks are stored row by row as integer codes in flat byte arrays,
+    so the grid can be snapshotted and restored without copying objects.
+
     Attributes:
-        grid (list):
-            A 2D list of Block objects representing the grid layout.
+        width (int):
+            The number of columns in the grid.
+        height (int):
+            The number of rows in the grid.
+        types (bytearray):
+            The block type code of every cell, indexed by y * width + x.
+        fixed (bytearray):
+            1 for every cell holding a fixed block, 0 otherwise.
     '''
 
+    __slots__ = ('height', 'width', 'types', 'fixed',
+                 'initial_types', 'initial_fixed')
+
     def __init__(self, grid):
         '''
         Initializes a Grid instance with a specified grid layout.
@@ -257,8 +369,26 @@ class Grid:
             grid (list):
                Containing Block objects that define the initial grid layout.
         '''
-        self.grid = grid
-        self.initial_grid = copy.deepcopy(grid)
+        self.height = len(grid)
+        self.width = len(grid[0])
+        self.types = bytearray(BLOCK_CODES[block.block_type]
+                               for row in grid for block in row)
+        self.fixed = bytearray(block.fixed for row in grid for block in row)
+        self.initial_types = bytes(self.types)
+        self.initial_fixed = bytes(self.fixed)
+
+    @property
+    def grid(self):
+        '''
+        Builds a read-only 2D list of Block objects from the stored codes,
+        used for printing and drawing the grid.
+
+        Returns:
+            list of list of Block:
+                The blocks of the grid, indexed as [y][x].
+        '''
+        return [[self.get_block(x, y) for x in range(self.width)]
+                for y in range(self.height)]
 
     def set_block(self, x, y, block):
         '''
@@ -269,7 +399,9 @@ class Grid:
             y (int): The y-coordinate of the block position.
             block (Block): The block object to place at the specified position.
         '''
-        self.grid[y][x] = block
+        index = y * self.width + x
+        self.types[index] = BLOCK_CODES[block.block_type]
+        self.fixed[index] = block.fixed
 
     def get_block(self, x, y):
         '''
@@ -280,9 +412,10 @@ class Grid:
             y (int): The y-coordinate of the block position.
 
         Returns:
-            Block: The block at the specified position.
+            Block: A shared, read-only view of the block at the position.
         '''
-        return self.grid[y][x]
+        index = y * self.width + x
+        return BLOCK_VIEWS[self.types[index], self.fixed[index]]
 
     def is_within_bounds(self, x, y):
         '''
@@ -298,13 +431,14 @@ class Grid:
             bool:
                 True if the position is within bounds, False otherwise.
         '''
-        return 0 <= x < len(self.grid[0]) and 0 <= y < len(self.grid)
+        return 0 <= x < self.width and 0 <= y < self.height
 
     def reset_to_initial(self):
         '''
         Resets the grid back to its initial configuration.
         '''
-        self.grid = copy.deepcopy(self.initial_grid)
+        self.types[:] = self.initial_types
+        self.fixed[:] = self.initial_fixed
 
     def find_empty_positions(self):
         '''
@@ -314,11 +448,16 @@ class Grid:
             empty_positions (list):
                 List of (x, y) positions that are empty and can hold a block.
         '''
+        width = self.width
+        types = self.types
+        fixed = self.fixed
         empty_positions = []
-        for y in range(len(self.grid)):
-            for x in range(len(self.grid[0])):
-                if self.get_block(x, y).is_empty():
-                    empty_positions.append((x, y))
+        # Let bytearray.find skip over the non-empty cells
+        index = types.find(EMPTY)
+        while index != -1:
+            if not fixed[index]:
+                empty_positions.append((index % width, index // width))
+            index = types.find(EMPTY, index + 1)
         return empty_positions
 
     def place_block(self, x, y, block_type):
@@ -338,10 +477,13 @@ class Grid:
                 True if the block was placed successfully.
                 False if the position was not empty.
         '''
-        if self.is_within_bounds(x, y) and self.get_block(x, y).is_empty():
-            self.set_block(x, y, Block(block_type))
-            return True
-        return False
+        if not self.is_within_bounds(x, y):
+            return False
+        index = y * self.width + x
+        if self.types[index] != EMPTY or self.fixed[index]:
+            return False
+        self.types[index] = BLOCK_CODES[block_type]
+        return True
 
 
 def read_bff_file(file_path):
@@ -380,43 +522,34 @@ def read_bff_file(file_path):
                 grid_section = False
                 continue
             if grid_section:
-                # Start with a 'none' fixed block for padding
+                # Start with a 'none' fixed block for padding, then pad
+                # after every block
                 row = [Block('none', fixed=True)]
                 for char in line:
-                    if char == 'x':
-                        row.append(Block('none', fixed=True))
-                        row.append(Block('none', fixed=True))
-                    elif char == 'o':
-                        row.append(Block('empty'))
-                        row.append(Block('none', fixed=True))
-                    elif char == 'A':
-                        row.append(Block('reflect', fixed=True))
-                        row.append(Block('none', fixed=True))
-                    elif char == 'B':
-                        row.append(Block('opaque', fixed=True))
-                        row.append(Block('none', fixed=True))
-                    elif char == 'C':
-                        row.append(Block('refract', fixed=True))
+                    block_kind = BFF_GRID_BLOCKS.get(char)
+                    if block_kind is not None:
+                        row.append(Block(*block_kind))
                         row.append(Block('none', fixed=True))
                 grid.append(row)
-            elif (line.startswith('A') or
-                  line.startswith('B') or
-                  line.startswith('C')):
+                continue
+
+            line_kind = BFF_LINE_KINDS.get(line[0])
+            if line_kind == 'block':
                 block_type, count = line.split()
                 avaliable_blocks[block_type] = int(count)
-            elif line.startswith('L'):
+            elif line_kind == 'laser':
                 _, x, y, vx, vy = line.split()
                 lasers.append(Laser(int(x), int(y), int(vx), int(vy)))
-            elif line.startswith('P'):
+            elif line_kind == 'point':
                 _, x, y = line.split()
                 points.append((int(x), int(y)))
 
     # Adding rows of 'none' fixed blocks above, between, and below the main
     # grid
-    padded_grid = [[Block('none', fixed=True)] * len(grid[0])]
+    padded_grid = [[Block('none', fixed=True) for _ in grid[0]]]
     for row in grid:
         padded_grid.append(row)
-        padded_grid.append([Block('none', fixed=True)] * len(row))
+        padded_grid.append([Block('none', fixed=True) for _ in row])
 
     # Create a data dictionary to store all the parsed information
     data = {
@@ -429,6 +562,168 @@ def read_bff_file(file_path):
     return data
 
 
+def laser_action(x_block, y_block):
+    '''
+    Decides how a laser reacts to the blocks beside it. A reflect block
+    along x wins over one along y, then opaque blocks, then refract
+    blocks along x and y.
+
+    Args:
+        x_block (int):
+            The code of the block beside the laser along x.
+        y_block (int):
+            The code of the block beside the laser along y.
+
+    Returns:
+        int:
+            One of the ACTION_* codes.
+    '''
+    if x_block == REFLECT:
+        return ACTION_REFLECT_X
+    if y_block == REFLECT:
+        return ACTION_REFLECT_Y
+    if x_block == OPAQUE or y_block == OPAQUE:
+        return ACTION_ABSORB
+    if x_block == REFRACT:
+        return ACTION_REFRACT_X
+    if y_block == REFRACT:
+        return ACTION_REFRACT_Y
+    return ACTION_MOVE
+
+
+# Action of every (x_block << 4) | y_block pair, so tracing takes one lookup
+LASER_ACTIONS = tuple(laser_action(pair >> 4, pair & 15)
+                      for pair in range(256))
+
+
+def trace_laser(types, width, height, x, y, vx, vy):
+    '''
+    Traces a single laser through the block codes of a grid.
+
+    Only plain integers and the flat code array are used here, so this
+    is the hot loop of the solver. At each step the laser checks the
+    block beside it along x, (x + vx, y), or along y, (x, y + vy),
+    whichever can hold a block, and looks up what to do in LASER_ACTIONS.
+    Positions are recorded as flat cell indices (y * width + x) to avoid
+    building a tuple per step; the laser stops once it leaves the grid,
+    is absorbed or starts going round in a cycle.
+
+    Args:
+        types (bytearray):
+            The block type codes of the grid, indexed by y * width + x.
+        width (int):
+            The number of columns in the grid.
+        height (int):
+            The number of rows in the grid.
+        x, y (int):
+            The starting position of the laser.
+        vx, vy (int):
+            The direction of the laser.
+
+    Returns:
+        tuple:
+            path (list of int):
+                The cell indices of the positions the laser passes,
+                starting position included.
+            new_lasers (list of tuple):
+                The (x, y, vx, vy) states of the lasers split off by
+                refract blocks.
+    '''
+    path = []
+    new_lasers = []
+    if not (0 <= x < width and 0 <= y < height):
+        return path, new_lasers
+    path.append(y * width + x)
+
+    # A laser coming back to an earlier state would only repeat itself, so
+    # compare with a saved state, saved again after 1, 2, 4, ... steps
+    # (Brent's cycle detection)
+    saved_state = (x, y, vx, vy)
+    save_step = 1
+
+    for step in range(1, MAX_STEPS_PER_CELL * width * height + 1):
+        # Blocks only sit at odd (x, y), so at most one of the two blocks
+        # beside the laser can be a real one: the block along y when x is
+        # odd, the block along x otherwise. The other one is always 'none'.
+        # Stop if that block is outside the grid
+        if x & 1:
+            y_next = y + vy
+            if not 0 <= y_next < height:
+                break
+            action = LASER_ACTIONS[types[y_next * width + x]]
+        else:
+            x_next = x + vx
+            if not 0 <= x_next < width:
+                break
+            action = LASER_ACTIONS[types[y * width + x_next] << 4]
+
+        # Checked roughly by how often each action comes up
+        if action == ACTION_MOVE:
+            pass
+        elif action == ACTION_REFLECT_X:
+            vx = -vx
+        elif action == ACTION_REFLECT_Y:
+            vy = -vy
+        elif action == ACTION_ABSORB:
+            break
+        elif action == ACTION_REFRACT_X:
+            new_lasers.append((x, y, -vx, vy))
+        else:
+            new_lasers.append((x, y, vx, -vy))
+
+        x += vx
+        y += vy
+        if not (0 <= x < width and 0 <= y < height):
+            break
+        path.append(y * width + x)
+
+        if x == saved_state[0] and (x, y, vx, vy) == saved_state:
+            break
+        if step == save_step:
+            saved_state = (x, y, vx, vy)
+            save_step *= 2
+
+    return path, new_lasers
+
+
+@functools.lru_cache(maxsize=None)
+def load_font(font_size):
+    '''
+    Loads the font used in the solution images, once per size.
+
+    Args:
+        font_size (int):
+            The size of the font.
+
+    Returns:
+        ImageFont:
+            Arial if it is available, Pillow's default font otherwise.
+    '''
+    try:
+        return ImageFont.truetype("arial.ttf", font_size)
+    except IOError:
+        return ImageFont.load_default()
+
+
+@functools.lru_cache(maxsize=256)
+def text_line_height(font, line):
+    '''
+    Measures how far a line of text reaches below its starting point.
+    Many lines, like the section headers, repeat from one image to the next.
+
+    Args:
+        font (ImageFont):
+            The font the line is drawn with.
+        line (str):
+            The text of the line.
+
+    Returns:
+        int:
+            The bottom of the line's bounding box.
+    '''
+    return font.getbbox(line)[3]
+
+
 class LazorGame:
     '''
     A class representing the Lazor Game, handling grid setup,
@@ -453,42 +748,54 @@ class LazorGame:
         self.points = set(data['points'])
         self.available_blocks = data['avaliable_blocks']
         self.solution_found = False
-        self.initial_lasers = [
-            Laser(
-                laser.x,
-                laser.y,
-                laser.vx,
-                laser.vy) for laser in data['lasers']]
+        # Cell indices of the target points, -1 for points off the grid
+        width = self.grid.width
+        self._targets = {y * width + x if self.grid.is_within_bounds(x, y)
+                         else -1 for (x, y) in self.points}
+        # 1 for every cell holding a target point, indexed like the grid
+        self.target_mask = bytearray(width * self.grid.height)
+        for index in self._targets - {-1}:
+            self.target_mask[index] = 1
+        # Initial (x, y, vx, vy) of every laser, traced directly by the solver
+        self.laser_states = tuple((laser.x, laser.y, laser.vx, laser.vy)
+                                  for laser in data['lasers'])
+        self.initial_lasers = [Laser(*state) for state in self.laser_states]
+        # 1 for every cell a laser passes through, filled for the output
+        self.hit_mask = bytearray(width * self.grid.height)
 
     def process_laser_paths(self, lasers):
         '''
-        Calls laser_path for each laser and updates the grid with laser paths,
-        handling any new lasers generated by refraction. Additionally, checks
-        if all target points are intersected by lasers to validate solution.
+        Traces each laser and records the laser paths in hit_mask,
+        handling any new lasers generated by refraction. The grid
+        itself is left untouched. Additionally, checks if all target points
+        are intersected by lasers to validate solution.
 
         Returns:
             bool:
                 True if the solution is valid, False otherwise.
         '''
-        laser_queue = list(lasers)
-        hit_points = set()
+        grid = self.grid
+        width = grid.width
+        hit_mask = self.hit_mask = bytearray(width * grid.height)
+        # Lasers are traced as plain (x, y, vx, vy) states
+        laser_queue = deque((laser.x, laser.y, laser.vx, laser.vy)
+                            for laser in lasers)
+        traced = set()
 
         while laser_queue:
-            current_laser = laser_queue.pop(0)  # Get the next laser to process
-            laser_data = self.calculate_laser_path(self.grid, [current_laser])
-
-            for path in laser_data['positions']:
-                for (x, y) in path:
-                    if self.grid.is_within_bounds(x, y):
-                        # Add to hit points set
-                        hit_points.add((x, y))
-                        block_type = self.grid.get_block(x, y).block_type
-                        if block_type == 'empty' or block_type == 'none':
-                            self.grid.grid[y][x] = Block('laser', fixed=True)
-
-            laser_queue.extend(laser_data['new_lasers'])
+            state = laser_queue.popleft()
+            if state in traced:
+                continue
+            traced.add(state)
+            path, spawned = trace_laser(grid.types, width, grid.height,
+                                        *state)
+            # Paths only hold positions within the grid
+            for index in path:
+                hit_mask[index] = 1
+            laser_queue.extend(spawned)
 
-        return self.points.issubset(hit_points)
+        return all(index != -1 and hit_mask[index]
+                   for index in self._targets)
 
     def print_grid(self, grid):
         '''
@@ -535,182 +842,347 @@ class LazorGame:
                     new_lasers (list of Laser):
                         A list of new Laser instances created by refraction.
         '''
-        MAX_STEPS = 500
         positions = []
         new_lasers = []
+        width = grid_obj.width
 
         for laser in laser_objs:
-            current_positions = []
-            current_positions.append(laser.current_position())
-
-            steps = 0
-
-            while steps < MAX_STEPS:  # Stop if steps exceed MAX_STEPS
-                steps += 1
-                new_pos = laser.current_position()
-                x_new = (new_pos[0] + laser.vx, new_pos[1])
-                y_new = (new_pos[0], new_pos[1] + laser.vy)
-
-                # Check if the new position is within the grid bounds
-                if not grid_obj.is_within_bounds(x_new[0], x_new[1]):
-                    break
-                elif not grid_obj.is_within_bounds(y_new[0], y_new[1]):
-                    break
-
-                x_block = grid_obj.get_block(x_new[0], x_new[1])
-                y_block = grid_obj.get_block(y_new[0], y_new[1])
-
-                if x_block.block_type == 'reflect':
-                    laser.reflect_x()
-                    new_pos = laser.move()
-                    current_positions.append(new_pos)
-                elif y_block.block_type == 'reflect':
-                    laser.reflect_y()
-                    new_pos = laser.move()
-                    current_positions.append(new_pos)
-                elif (x_block.block_type == 'opaque' or
-                      y_block.block_type == 'opaque'):
-                    laser.absorb()
-                    break
-                elif x_block.block_type == 'refract':
-                    new_laser = laser.refract_x()
-                    new_pos = laser.move()
-                    current_positions.append(new_pos)
-                    new_lasers.append(new_laser)
-                elif y_block.block_type == 'refract':
-                    new_laser = laser.refract_y()
-                    new_pos = laser.move()
-                    current_positions.append(new_pos)
-                    new_lasers.append(new_laser)
-                elif (x_block.block_type == 'empty' or
-                      y_block.block_type == 'empty'):
-                    new_pos = laser.move()
-                    current_positions.append(new_pos)
-                elif (x_block.block_type == 'none' or
-                      y_block.block_type == 'none'):
-                    new_pos = laser.move()
-                    current_positions.append(new_pos)
-
-                # If the laser is absorbed or out of bounds, break the loop
-                if laser.vx == 0 and laser.vy == 0:
-                    break
-
-            positions.append(current_positions)
+            path, spawned = trace_laser(
+                grid_obj.types, width, grid_obj.height,
+                laser.x, laser.y, laser.vx, laser.vy)
+            positions.append([(index % width, index // width)
+                              for index in path])
+            new_lasers.extend(Laser(*state) for state in spawned)
 
         return {'positions': positions, 'new_lasers': new_lasers}
 
-    def all_possible_configs(self, grid_obj, block_dict):
+    def simulate_partial(self, previous=None, changed=None):
         '''
-        Generates all possible configurations for placing blocks on the grid.
+        Traces every laser on the current (possibly partial) grid without
+        marking the laser cells, so block placements can be undone cheaply.
+
+        A laser only probes the cells next to its path, so when a single
+        cell changed, the traces from before the change are reused for
+        every laser whose path does not pass by that cell.
 
         Args:
-            grid_obj (Grid):
-                An instance of the Grid class.
-            block_dict (dict):
-                A dictionary with block types as keys and counts as values.
+            previous (dict, optional):
+                The traces returned for the grid before the change.
+            changed (int, optional):
+                The cell index that changed since previous was traced.
 
         Returns:
-            block_configs (list of list of tuple):
-                Each inner list contains tuples
-                representing possible positions for each block.
-        '''
-        block_list = [Block(block_type) for block_type,
-                      count in block_dict.items() for _ in range(count)]
-        available_positions = grid_obj.find_empty_positions()
-        all_same_type = all(
-            block.block_type ==
-            block_list[0].block_type for block in block_list)
-        if all_same_type:
-            # Use combinations if all blocks are of the same type
-            block_configs = [
-                list(positions)
-                for positions in itertools.combinations(
-                    available_positions, len(block_list))
-            ]
-        else:
-            # Use permutations if blocks are of different types
-            block_configs = [
-                list(positions)
-                for positions in itertools.permutations(
-                    available_positions, len(block_list))
+            tuple:
+                hit_points (int):
+                    A bitmap of the cells hit by the lasers, with bit
+                    y * width + x set for every hit cell.
+                traces (dict):
+                    The (path, new_lasers, path_bits) trace of every laser
+                    state, to pass back in as previous.
+        '''
+        grid = self.grid
+        width = grid.width
+        around_changed = 0
+        if changed is not None:
+            around_changed = (1 << changed + 1 | 1 << changed - 1 |
+                              1 << changed + width | 1 << changed - width)
+        laser_queue = deque(self.laser_states)
+        hit_points = 0
+        traces = {}
+
+        while laser_queue:
+            state = laser_queue.popleft()
+            # The same laser state always traces the same path
+            if state in traces:
+                continue
+            trace = previous.get(state) if previous else None
+            if trace is None or trace[2] & around_changed:
+                path, spawned = trace_laser(grid.types, width, grid.height,
+                                            *state)
+                path_bits = 0
+                for index in path:
+                    path_bits |= 1 << index
+                trace = (path, spawned, path_bits)
+            traces[state] = trace
+            hit_points |= trace[2]
+            laser_queue.extend(trace[1])
+
+        return hit_points, traces
+
+    def touched_positions(self, hit_points, positions):
+        '''
+        Finds the positions a laser path probes while passing by.
+        A block placed anywhere else cannot change the current laser paths.
+
+        Args:
+            hit_points (int):
+                A bitmap of the cells intersected by the lasers.
+            positions (int):
+                A bitmap of the candidate cells to check.
+
+        Returns:
+            int:
+                A bitmap of the candidate positions next to at least one
+                hit point.
+        '''
+        width = self.grid.width
+        # Neighbors wrapping around a row edge are padding cells, which
+        # are never candidate positions
+        return (hit_points << 1 | hit_points >> 1 | hit_points << width |
+                hit_points >> width) & positions
+
+    def find_symmetries(self):
+        '''
+        Finds the flips and rotations that leave the puzzle unchanged,
+        i.e. map the initial grid, the lasers and the target points onto
+        themselves. Placements that are images of each other under such a
+        symmetry are either both solvable or both not.
+
+        Returns:
+            list:
+                One tuple per symmetry other than the identity, holding for
+                every cell index the index of the cell it is mapped from.
+        '''
+        width, height = self.grid.width, self.grid.height
+        # Each transform maps (x, y, vx, vy) to its mirrored image
+        transforms = [
+            lambda x, y, vx, vy: (width - 1 - x, y, -vx, vy),
+            lambda x, y, vx, vy: (x, height - 1 - y, vx, -vy),
+            lambda x, y, vx, vy: (width - 1 - x, height - 1 - y, -vx, -vy),
+        ]
+        if width == height:
+            # Swapping the axes is safe because the two blocks probed in a
+            # step are never both real block cells in the padded grid
+            transforms += [
+                lambda x, y, vx, vy: (y, x, vy, vx),
+                lambda x, y, vx, vy: (width - 1 - y, width - 1 - x,
+                                      -vy, -vx),
+                lambda x, y, vx, vy: (width - 1 - y, x, -vy, vx),
+                lambda x, y, vx, vy: (y, width - 1 - x, vy, -vx),
             ]
 
-        return block_configs
+        types = self.grid.initial_types
+        fixed = self.grid.initial_fixed
+        lasers = sorted(self.laser_states)
+        symmetries = []
+        for transform in transforms:
+            if sorted(transform(*state) for state in lasers) != lasers:
+                continue
+            if {transform(x, y, 0, 0)[:2]
+                    for (x, y) in self.points} != self.points:
+                continue
+            source = [0] * (width * height)
+            for y in range(height):
+                for x in range(width):
+                    x_image, y_image = transform(x, y, 0, 0)[:2]
+                    source[y_image * width + x_image] = y * width + x
+            if all(types[index] == types[source[index]] and
+                   fixed[index] == fixed[source[index]]
+                   for index in range(len(source))):
+                symmetries.append(tuple(source))
+        return symmetries
 
     def solve(self):
         '''
-        Attempts to solve the puzzle by trying different block placements.
+        Attempts to solve the puzzle by placing blocks one at a time
+        with a backtracking search.
 
         Returns:
             bool:
                 True if a solution is found, False otherwise.
         '''
-        # Generate all possible configurations of block placements
-        block_configurations = self.all_possible_configs(
-            self.grid, self.available_blocks)
-
-        for config in block_configurations:
-            self.place_blocks_in_grid(config)
-
-            if self.process_laser_paths(self.lasers):
-                self.solution_found = True
-                print("Solution found!")
-                self.output_solution()
-                return True
-
-            # Reset the game
-            self.grid.reset_to_initial()
+        # Target points off the grid can never be hit
+        if -1 in self._targets:
+            print("No solution found.")
+            return False
+        # Diagonal lasers keep the parity of x + y, splits included, so a
+        # target point of another parity can never be hit
+        if all(vx and vy for (_, _, vx, vy) in self.laser_states):
+            parities = {(x + y) % 2 for (x, y, _, _) in self.laser_states}
+            if any((x + y) % 2 not in parities for (x, y) in self.points):
+                print("No solution found.")
+                return False
+
+        # Block types are tried in this order at every position. Opaque
+        # blocks go first: cutting off a laser leaves fewer cells to branch
+        # on, which found solutions sooner on the bundled puzzles
+        block_type_mapping = {'B': 'opaque', 'A': 'reflect', 'C': 'refract'}
+        blocks_left = {block_type: self.available_blocks[block_letter]
+                       for block_letter, block_type
+                       in block_type_mapping.items()
+                       if self.available_blocks[block_letter] > 0}
+
+        width = self.grid.width
+        empty_positions = [y * width + x
+                           for (x, y) in self.grid.find_empty_positions()]
+        if len(empty_positions) < sum(blocks_left.values()):
+            print("No solution found.")
+            return False
+
+        # Try the positions most of the initial laser paths pass by first
+        initial_hits, initial_traces = self.simulate_partial()
+        impact = {position: 0 for position in empty_positions}
+        for index in set().union(*(trace[0]
+                                   for trace in initial_traces.values())):
+            for neighbor in (index + 1, index - 1,
+                             index + width, index - width):
+                if neighbor in impact:
+                    impact[neighbor] += 1
+        self._position_order = sorted(
+            empty_positions, key=lambda position: -impact[position])
+        self._explored = set()
+        self._symmetries = self.find_symmetries()
+        self._target_bits = 0
+        for index in self._targets:
+            self._target_bits |= 1 << index
+
+        positions_left = 0
+        for position in empty_positions:
+            positions_left |= 1 << position
+        if self._backtrack(positions_left, blocks_left, initial_traces):
+            self.solution_found = True
+            # Mark the laser paths of the final grid for the output
             self.reset_lasers()
+            self.process_laser_paths(self.lasers)
+            print("Solution found!")
+            self.output_solution()
+            return True
 
         print("No solution found.")
         return False
 
-    def place_blocks_in_grid(self, config):
+    def _grid_key(self):
         '''
-        Places blocks on the grid based on the provided configuration.
+        Builds the key of the current grid in the explored set: the
+        smallest image of its block codes under the puzzle's symmetries,
+        so mirror images of a grid share one key.
+
+        Returns:
+            bytes:
+                The canonical block codes of the grid.
+        '''
+        types = self.grid.types
+        grid_key = bytes(types)
+        for source in self._symmetries:
+            grid_key = min(grid_key, bytes(map(types.__getitem__, source)))
+        return grid_key
+
+    def _backtrack(self, positions_left, blocks_left, parent_traces,
+                   changed=None):
+        '''
+        Recursively places the remaining blocks on the grid.
+
+        Only positions the current laser paths pass by are tried, since a
+        block anywhere else leaves the paths unchanged. Once all target
+        points are hit, the remaining blocks are parked out of the way.
+        Grids reached before through another placement order, or mirror
+        images of them under a symmetry of the puzzle, are skipped.
 
         Args:
-            config (list of tuples):
-                List of positions where each block should be placed.
-        '''
-        block_type_mapping = {'A': 'reflect', 'B': 'opaque', 'C': 'refract'}
-        # Map available blocks to their types and place them in specified
-        # positions
-        block_list = []
-        for block_letter, count in self.available_blocks.items():
-            actual_type = block_type_mapping.get(block_letter, 'empty')
-            block_list.extend([actual_type] * count)
-        for position, block_type in zip(config, block_list):
-            x, y = position
-            self.grid.set_block(x, y, Block(block_type))
+            positions_left (int):
+                A bitmap of the empty cells that can still hold a block.
+            blocks_left (dict):
+                Block types and the number of them still to place.
+            parent_traces (dict):
+                The laser traces of the grid before the last placement.
+            changed (int, optional):
+                The cell index of the last placement.
+
+        Returns:
+            bool:
+                True if a solution was found and left in the grid,
+                False otherwise. The grid is restored when False.
+        '''
+        types = self.grid.types
+        remaining = sum(blocks_left.values())
+        if remaining == 0:
+            return self.validate_solution()
+
+        hit_points, traces = self.simulate_partial(parent_traces, changed)
+        solved = hit_points & self._target_bits == self._target_bits
+        if not solved and blocks_left.get('opaque', 0) == remaining:
+            # Opaque blocks only cut laser paths short, so the missing
+            # target points can no longer be reached
+            return False
+
+        touched = self.touched_positions(hit_points, positions_left)
+        if solved:
+            # Only take as many parking positions as there are blocks left
+            off_path_bits = positions_left & ~touched
+            off_path = list(itertools.islice(
+                (position for position in self._position_order
+                 if off_path_bits >> position & 1),
+                remaining))
+            if len(off_path) == remaining:
+                off_path = iter(off_path)
+                for block_type, count in blocks_left.items():
+                    for _ in range(count):
+                        types[next(off_path)] = BLOCK_CODES[block_type]
+                return True
+
+        # Placed blocks are movable, so only their type codes are written
+        for position in self._position_order:
+            if not touched >> position & 1:
+                continue
+            child_positions = positions_left & ~(1 << position)
+            for block_type, count in blocks_left.items():
+                if count == 0:
+                    continue
+                types[position] = BLOCK_CODES[block_type]
+                # Skip grids reached before without entering them
+                grid_key = self._grid_key()
+                if grid_key not in self._explored:
+                    self._explored.add(grid_key)
+                    blocks_left[block_type] -= 1
+                    if self._backtrack(child_positions, blocks_left, traces,
+                                       position):
+                        return True
+                    blocks_left[block_type] += 1
+                # Undo the placement
+                types[position] = EMPTY
+
+        return False
 
     def reset_lasers(self):
         '''
         Resets the lasers to the original lasers with their initial states.
         '''
-        self.lasers = [Laser(laser.x, laser.y, laser.vx, laser.vy)
-                       for laser in self.initial_lasers]
+        self.lasers = [Laser(*state) for state in self.laser_states]
 
     def validate_solution(self):
         '''
         Checks if all target points are intersected by lasers.
+        Stops tracing as soon as the last target point is hit.
 
         Returns:
             bool:
                 True if all points are intersected, False otherwise.
         '''
-        hit_points = set()
-        for laser in self.lasers:
-            laser_data = self.calculate_laser_path(self.grid, [laser])
-            for path in laser_data['positions']:
-                hit_points.update(path)
-        return self.points.issubset(hit_points)
+        grid = self.grid
+        remaining_targets = set(self._targets)
+        laser_queue = deque(self.laser_states)
+        traced = set()
+
+        while laser_queue and remaining_targets:
+            state = laser_queue.popleft()
+            # A refracted beam can lead back to a state traced before
+            if state in traced:
+                continue
+            traced.add(state)
+            path, spawned = trace_laser(grid.types, grid.width, grid.height,
+                                        *state)
+            remaining_targets.difference_update(path)
+            laser_queue.extend(spawned)
+
+        return not remaining_targets
 
     def output_solution(self):
         '''
         Outputs the final solution.
         '''
         print("\nFinal Solution:")
+        grid_rows = self.grid.grid
+        width = self.grid.width
 
         # Create a set of laser starting points for easy lookup
         laser_start_points = {(laser.x, laser.y)
@@ -718,16 +1190,17 @@ class LazorGame:
 
         # Print the grid with blocks, laser paths, laser start points, and
         # target points
-        for y, row in enumerate(self.grid.grid):
+        for y, row in enumerate(grid_rows):
             row_repr = []
             for x, block in enumerate(row):
                 if (x, y) in laser_start_points:
                     # Mark laser starting points (using 'S' here)
                     row_repr.append('S')
-                elif (x, y) in self.points:
+                elif self.target_mask[y * width + x]:
                     # Mark target points (using 'T' here)
                     row_repr.append('T')
-                elif block.block_type == 'laser':
+                elif (self.hit_mask[y * width + x] and
+                      block.block_type in ('empty', 'none')):
                     row_repr.append('L')
                 elif block.block_type == 'reflect':
                     row_repr.append('A')
@@ -746,7 +1219,7 @@ class LazorGame:
 
         # Print each block's position
         print("\nBlocks placed:")
-        for y, row in enumerate(self.grid.grid):
+        for y, row in enumerate(grid_rows):
             for x, block in enumerate(row):
                 if block.block_type in ['reflect', 'opaque', 'refract']:
                     print(
@@ -772,22 +1245,19 @@ class LazorGame:
         solution_dir = "solution"
         os.makedirs(solution_dir, exist_ok=True)
         cell_size = 30
-        grid_width = len(self.grid.grid[0]) * cell_size
-        grid_height = len(self.grid.grid) * cell_size
+        grid_rows = self.grid.grid
+        grid_width = self.grid.width * cell_size
+        grid_height = self.grid.height * cell_size
 
         # Font setup
-        font_size = 11
-        try:
-            font = ImageFont.truetype("arial.ttf", font_size)
-        except IOError:
-            font = ImageFont.load_default()
+        font = load_font(11)
 
         text_lines = [
             f"Game: {os.path.basename(self.file_path)}",
             f"Time to solve: {solve_time:.2f} seconds",
             "Blocks placed:",
             *[f"- {block.block_type.capitalize()} at ({x}, {y})"
-              for y, row in enumerate(self.grid.grid)
+              for y, row in enumerate(grid_rows)
               for x, block in enumerate(row)
               if block.block_type in ['reflect', 'opaque', 'refract']],
             "Laser starting points:",
@@ -799,17 +1269,18 @@ class LazorGame:
         ]
 
         text_space_height = sum(
-            font.getbbox(line)[3] + 5 for line in text_lines) + 10
+            text_line_height(font, line) + 5 for line in text_lines) + 10
         image_height = grid_height + text_space_height
         image = Image.new('RGB', (grid_width, image_height), 'white')
         draw = ImageDraw.Draw(image)
 
         colors = {
-            'reflect': 'blue',
-            'opaque': 'orange',
-            'refract': 'yellow',
-            'empty': 'gray',
-            'none': 'white'
+            'reflect': (0, 0, 255),
+            'opaque': (255, 165, 0),
+            'refract': (255, 255, 0),
+            'empty': (128, 128, 128),
+            'none': (255, 255, 255),
+            'laser_start': (255, 0, 0)
         }
         labels = {
             'reflect': 'A',
@@ -821,13 +1292,53 @@ class LazorGame:
 
         laser_start_points = {(laser.x, laser.y): (laser.vx, laser.vy)
                               for laser in self.initial_lasers}
-        for y, row in enumerate(self.grid.grid):
+        # Cells the lasers pass through without meeting a block
+        width = self.grid.width
+        laser_cells = {(index % width, index // width)
+                       for index, hit in enumerate(self.hit_mask)
+                       if hit and self.grid.types[index] in (EMPTY, NONE)}
+
+        # Paint every cell as a single pixel and scale them up in one go,
+        # so only the labels and arrows are drawn cell by cell
+        cell_colors = []
+        for y, row in enumerate(grid_rows):
+            for x, block in enumerate(row):
+                if (x, y) in laser_start_points:
+                    cell_colors.append(colors['laser_start'])
+                elif (self.target_mask[y * width + x] or
+                      (x, y) in laser_cells):
+                    cell_colors.append(colors['none'])
+                else:
+                    cell_colors.append(
+                        colors.get(block.block_type, colors['none']))
+        cells = Image.new('RGB', (self.grid.width, self.grid.height))
+        cells.putdata(cell_colors)
+        image.paste(cells.resize((grid_width, grid_height), Image.NEAREST))
+
+        # Draw every kind of labelled cell once and paste copies of it
+        text_offset = (cell_size // 5, cell_size // 3)
+        label_tiles = {}
+        for block_type in ('reflect', 'opaque', 'refract'):
+            tile = Image.new('RGB', (cell_size, cell_size),
+                             colors[block_type])
+            ImageDraw.Draw(tile).text(text_offset, labels[block_type],
+                                      fill="black", font=font)
+            label_tiles[block_type] = tile
+        # The target outline reaches one pixel into the next cells
+        tile = Image.new('RGB', (cell_size + 1, cell_size + 1),
+                         colors['none'])
+        tile_draw = ImageDraw.Draw(tile)
+        tile_draw.rectangle([(0, 0), (cell_size, cell_size)],
+                            outline="green", width=3)
+        tile_draw.text(text_offset, labels['target'], fill="green",
+                       font=font)
+        label_tiles['target'] = tile
+
+        for y, row in enumerate(grid_rows):
             for x, block in enumerate(row):
                 top_left = (x * cell_size, y * cell_size)
-                bottom_right = ((x + 1) * cell_size, (y + 1) * cell_size)
 
                 if (x, y) in laser_start_points:
-                    draw.rectangle([top_left, bottom_right], fill="red")
                     # Draw an arrow based on the laser's direction
                     vx, vy = laser_start_points[(x, y)]
                     center = (
@@ -840,31 +1351,14 @@ class LazorGame:
                     )
                     draw.line([center, arrow_end], fill="white", width=2)
                     # Draw arrowhead
-                    arrowhead_length = 6
-                    angle_offset = math.pi / 6
-                    angle_main = math.atan2(vy, vx)
-                    left_end = (
-                        arrow_end[0] -
-                        arrowhead_length *
-                        math.cos(
-                            angle_main +
-                            angle_offset),
-                        arrow_end[1] -
-                        arrowhead_length *
-                        math.sin(
-                            angle_main +
-                            angle_offset))
-                    right_end = (
-                        arrow_end[0] -
-                        arrowhead_length *
-                        math.cos(
-                            angle_main -
-                            angle_offset),
-                        arrow_end[1] -
-                        arrowhead_length *
-                        math.sin(
-                            angle_main -
-                            angle_offset))
+                    offsets = ARROWHEAD_OFFSETS.get((vx, vy))
+                    if offsets is None:
+                        offsets = arrowhead_offsets(vx, vy)
+                    left_dx, left_dy, right_dx, right_dy = offsets
+                    left_end = (arrow_end[0] - left_dx,
+                                arrow_end[1] - left_dy)
+                    right_end = (arrow_end[0] - right_dx,
+                                 arrow_end[1] - right_dy)
                     draw.line([arrow_end, left_end], fill="white", width=2)
                     draw.line([arrow_end, right_end], fill="white", width=2)
                     draw.text(
@@ -874,49 +1368,32 @@ class LazorGame:
                         fill="white",
                         font=font)
 
-                elif (x, y) in self.points:
-                    draw.rectangle([top_left, bottom_right],
-                                   outline="green", width=3)
-                    draw.text(
-                        (top_left[0] + cell_size // 5,
-                         top_left[1] + cell_size // 3),
-                        labels['target'],
-                        fill="green",
-                        font=font)
-                else:
-                    color = colors.get(block.block_type, 'white')
-                    draw.rectangle([top_left, bottom_right], fill=color)
-                    if block.block_type in labels:
-                        draw.text((top_left[0] + cell_size // 5,
-                                   top_left[1] + cell_size // 3),
-                                  labels[block.block_type],
-                                  fill="black",
-                                  font=font)
+                elif self.target_mask[y * self.grid.width + x]:
+                    image.paste(label_tiles['target'], top_left)
+                elif block.block_type in label_tiles:
+                    image.paste(label_tiles[block.block_type], top_left)
 
         # Draw grid lines
-        for i in range(1, len(self.grid.grid[0])):
+        for i in range(1, self.grid.width):
             x = i * cell_size
             draw.line([(x, 0), (x, grid_height)], fill="black", width=1)
-        for i in range(1, len(self.grid.grid)):
+        for i in range(1, self.grid.height):
             y = i * cell_size
             draw.line([(0, y), (grid_width, y)], fill="black", width=1)
 
         # Draw laser path dots for cells with laser path
-        for y, row in enumerate(self.grid.grid):
-            for x, block in enumerate(row):
-                if block.block_type == 'laser' and (
-                        x, y) not in laser_start_points:
-                    center = (
-                        x * cell_size + cell_size // 2,
-                        y * cell_size + cell_size // 2)
-                    draw.ellipse([center[0] - 2, center[1] - 2,
-                                 center[0] + 2, center[1] + 2], fill="red")
+        for (x, y) in laser_cells - laser_start_points.keys():
+            center = (
+                x * cell_size + cell_size // 2,
+                y * cell_size + cell_size // 2)
+            draw.ellipse([center[0] - 2, center[1] - 2,
+                          center[0] + 2, center[1] + 2], fill="red")
 
         # Add text information at the bottom of the image
         text_y = grid_height + 10
         for line in text_lines:
             draw.text((10, text_y), line, fill="black", font=font)
-            text_y += font.getbbox(line)[3] + 5
+            text_y += text_line_height(font, line) + 5
 
         # Save the image
         filename = os.path.basename(self.file_path)